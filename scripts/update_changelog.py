@@ -1,13 +1,14 @@
 import datetime as dt
+import functools
 import os
 import re
 from collections.abc import Iterable
 from pathlib import Path
 
 import git
-import github.PullRequest
+import github.Issue
 import github.Repository
-from github import Github
+from github import Auth, Github, UnknownObjectException
 from jinja2 import Template
 
 CURRENT_FILE = Path(__file__)
@@ -15,6 +16,13 @@ ROOT = CURRENT_FILE.parents[1]
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GITHUB_REPO = os.getenv("GITHUB_REPOSITORY")
 GIT_BRANCH = os.getenv("GITHUB_REF_NAME")
+VERSION_REGEX = re.compile(r'\nversion = "\d+\.\d+\.\d+"\n')
+# Changelog group for each label, by order of precedence
+LABEL_TO_GROUP = {
+    "update": "Updated",
+    "bug": "Fixed",
+    "docs": "Documentation",
+}
 
 
 def main() -> None:
@@ -23,9 +31,10 @@ def main() -> None:
     """
     # Generate changelog for PRs merged yesterday
     merged_date = dt.date.today() - dt.timedelta(days=1)
-    repo = Github(login_or_token=GITHUB_TOKEN).get_repo(GITHUB_REPO)
-    merged_pulls = list(iter_pulls(repo, merged_date))
-    print(f"Merged pull requests: {merged_pulls}")
+    # Single client for all API calls, so connections are reused
+    gh = Github(auth=Auth.Token(GITHUB_TOKEN), pool_size=4)
+    merged_pulls = list(iter_pulls(gh, GITHUB_REPO, merged_date))
+    print(f"Merged pull requests: {[pull for pull, _ in merged_pulls]}")
     if not merged_pulls:
         print("Nothing was merged, existing.")
         return
@@ -40,6 +49,12 @@ def main() -> None:
     release_changes_summary = generate_md(grouped_pulls)
     print(f"Summary of changes: {release_changes_summary}")
 
+    # Skip if these changes were already released, e.g. on a re-run
+    repo = gh.get_repo(GITHUB_REPO, lazy=True)
+    if is_already_released(repo, release_changes_summary):
+        print("Latest release already contains these changes, exiting.")
+        return
+
     # Update CHANGELOG.md file
     release = f"{merged_date:%Y.%m.%d}"
     changelog_path = ROOT / "CHANGELOG.md"
@@ -64,23 +79,27 @@ def main() -> None:
 
 
 def iter_pulls(
-    repo: github.Repository.Repository,
+    gh: Github,
+    repo_name: str,
     merged_date: dt.date,
-) -> Iterable[github.PullRequest.PullRequest]:
-    """Fetch merged pull requests at the date we're interested in."""
-    recent_pulls = repo.get_pulls(
-        state="closed",
-        sort="updated",
-        direction="desc",
-    ).get_page(0)
-    for pull in recent_pulls:
-        if pull.merged and pull.merged_at.date() == merged_date:
-            yield pull
+) -> Iterable[tuple[github.Issue.Issue, set[str]]]:
+    """
+    Fetch merged pull requests at the date we're interested in.
+
+    Use the search API to filter on the merge date server-side: results
+    come back with their labels, saving a request per pull request.
+    Only attributes present in the search payload should be accessed, as
+    anything else (including ``raw_data``) fetches the full object.
+    """
+    query = f"repo:{repo_name} is:pr is:merged merged:{merged_date:%Y-%m-%d}"
+    for pull in gh.search_issues(query):
+        label_names = {label.name for label in pull.labels}
+        yield pull, label_names
 
 
 def group_pulls_by_change_type(
-    pull_requests_list: list[github.PullRequest.PullRequest],
-) -> dict[str, list[github.PullRequest.PullRequest]]:
+    pull_requests_list: list[tuple[github.Issue.Issue, set[str]]],
+) -> dict[str, list[github.Issue.Issue]]:
     """Group pull request by change type."""
     grouped_pulls = {
         "Changed": [],
@@ -88,76 +107,77 @@ def group_pulls_by_change_type(
         "Documentation": [],
         "Updated": [],
     }
-    for pull in pull_requests_list:
-        label_names = {label.name for label in pull.labels}
+    for pull, label_names in pull_requests_list:
         if "project infrastructure" in label_names:
             # Don't mention it in the changelog
             continue
-        if "update" in label_names:
-            group_name = "Updated"
-        elif "bug" in label_names:
-            group_name = "Fixed"
-        elif "docs" in label_names:
-            group_name = "Documentation"
-        else:
-            group_name = "Changed"
+        group_name = next(
+            (group for label, group in LABEL_TO_GROUP.items() if label in label_names),
+            "Changed",
+        )
         grouped_pulls[group_name].append(pull)
     return grouped_pulls
 
 
-def generate_md(grouped_pulls: dict[str, list[github.PullRequest.PullRequest]]) -> str:
-    """Generate markdown file from Jinja template."""
+@functools.cache
+def get_changelog_template() -> Template:
+    """Load and compile the changelog Jinja template once."""
     changelog_template = ROOT / ".github" / "changelog-template.md"
-    template = Template(changelog_template.read_text(), autoescape=True)
-    return template.render(grouped_pulls=grouped_pulls)
+    return Template(changelog_template.read_text(encoding="utf-8"), autoescape=False)
+
+
+def generate_md(grouped_pulls: dict[str, list[github.Issue.Issue]]) -> str:
+    """Generate markdown file from Jinja template."""
+    return get_changelog_template().render(grouped_pulls=grouped_pulls)
+
+
+def is_already_released(repo: github.Repository.Repository, summary: str) -> bool:
+    """Check whether the latest GitHub release has the same changes."""
+    try:
+        latest_release = repo.get_latest_release()
+    except UnknownObjectException:
+        # No release yet
+        return False
+    return (latest_release.body or "").strip() == summary.strip()
 
 
 def write_changelog(file_path: Path, release: str, content: str) -> None:
     """Write Release details to the changelog file."""
     content = f"## {release}\n{content}"
-    old_content = file_path.read_text()
-    updated_content = old_content.replace(
-        "<!-- GENERATOR_PLACEHOLDER -->",
-        f"<!-- GENERATOR_PLACEHOLDER -->\n\n{content}",
-    )
-    file_path.write_text(updated_content)
+    old_content = file_path.read_bytes()
+    head, placeholder, tail = old_content.partition(b"<!-- GENERATOR_PLACEHOLDER -->")
+    if not placeholder:
+        return
+    with file_path.open("wb") as f:
+        f.writelines([head, placeholder, b"\n\n", content.encode("utf-8"), tail])
 
 
 def update_version(file_path: Path, release: str) -> None:
     """Update template version in setup.py."""
-    old_content = file_path.read_text()
-    updated_content = re.sub(
-        r'\nversion = "\d+\.\d+\.\d+"\n',
-        f'\nversion = "{release}"\n',
-        old_content,
-    )
-    file_path.write_text(updated_content)
+    old_content = file_path.read_text(encoding="utf-8")
+    updated_content = VERSION_REGEX.sub(f'\nversion = "{release}"\n', old_content)
+    file_path.write_text(updated_content, encoding="utf-8")
 
 
 def update_git_repo(paths: list[Path], release: str) -> None:
     """Commit, tag changes in git repo and push to origin."""
     repo = git.Repo(ROOT)
-    for path in paths:
-        repo.git.add(path)
     message = f"Release {release}"
 
-    user = repo.git.config("--get", "user.name")
-    email = repo.git.config("--get", "user.email")
-
-    repo.git.commit(
-        m=message,
-        author=f"{user} <{email}>",
-    )
+    # Stage and commit in-process, author and committer come from git config
+    repo.index.add([str(path) for path in paths])
+    repo.index.commit(message)
     repo.git.tag("-a", release, m=message)
     server = f"https://{GITHUB_TOKEN}@github.com/{GITHUB_REPO}.git"
     print(f"Pushing changes to {GIT_BRANCH} branch of {GITHUB_REPO}")
-    repo.git.push(server, GIT_BRANCH)
-    repo.git.push("--tags", server, GIT_BRANCH)
+    repo.git.push("--follow-tags", server, GIT_BRANCH)
 
 
 if __name__ == "__main__":
     if GITHUB_REPO is None:
         raise RuntimeError("No github repo, please set the environment variable GITHUB_REPOSITORY")
+    if GITHUB_TOKEN is None:
+        raise RuntimeError("No github token, please set the GITHUB_TOKEN environment variable")
     if GIT_BRANCH is None:
         raise RuntimeError("No git branch set, please set the GITHUB_REF_NAME environment variable")
     main()
@@ -24,8 +24,7 @@ ALLOWED_HOSTS = ["localhost", "0.0.0.0", "127.0.0.1"]  # noqa: S104
 # https://docs.djangoproject.com/en/dev/ref/settings/#caches
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "",
+        "BACKEND": "django.core.cache.backends.dummy.DummyCache",
     },
 }
 
@@ -78,8 +77,13 @@ INTERNAL_IPS = ["127.0.0.1", "10.0.2.2"]
 if env("USE_DOCKER") == "yes":
     import socket
 
-    hostname, _, ips = socket.gethostbyname_ex(socket.gethostname())
-    INTERNAL_IPS += [".".join(ip.split(".")[:-1] + ["1"]) for ip in ips]
+    # Set HOST_IP to skip resolving the container hostname, which can be slow
+    host_ip = env("HOST_IP", default=None)
+    if host_ip:
+        ips = [host_ip]
+    else:
+        _, _, ips = socket.gethostbyname_ex(socket.gethostname())
+    INTERNAL_IPS += [ip.rsplit(".", 1)[0] + ".1" for ip in ips]
     {%- if cookiecutter.frontend_pipeline in ['Gulp', 'Webpack'] %}
     try:
         _, _, ips = socket.gethostbyname_ex("node")